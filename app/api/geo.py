@@ -0,0 +1,61 @@
+import os
+from typing import Optional, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# 5 символов geohash ≈ ячейка 4.9 x 4.9 км
+GRID_PRECISION = int(os.getenv("GEO_GRID_PRECISION", "5"))
+
+
+def encode(lat: float, lon: float, precision: Optional[int] = None) -> str:
+    precision = precision or GRID_PRECISION
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    cell = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(cell) < precision:
+        value, bounds = (lon, lon_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            bounds[0] = mid
+        else:
+            bits = bits * 2
+            bounds[1] = mid
+
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            cell.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(cell)
+
+
+def decode(cell: str) -> Tuple[float, float]:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in cell:
+        bits = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lon_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if (bits >> shift) & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def snap(lat: float, lon: float, precision: Optional[int] = None) -> Tuple[str, float, float]:
+    cell = encode(lat, lon, precision)
+    center_lat, center_lon = decode(cell)
+    return cell, center_lat, center_lon
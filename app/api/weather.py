@@ -1,11 +1,19 @@
 import os
+import time
+import threading
 import requests
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+CACHE_MAX_SIZE = 10000
+
+_cache: Dict[Tuple, Tuple[float, Dict]] = {}
+_cache_lock = threading.Lock()
+
 class WeatherAPI:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENWEATHER_API_KEY")
@@ -13,27 +21,21 @@ class WeatherAPI:
             logger.warning("OPENWEATHER_API_KEY не найден.")
         self.base_url = "https://api.openweathermap.org/data/2.5"
 
-    def get_current_weather(self, city: str) -> Optional[Dict[str, Any]]:
+    def get_current_weather(self, city: Optional[str] = None, lat: Optional[float] = None,
+                            lon: Optional[float] = None) -> Optional[Dict[str, Any]]:
         if not self.api_key:
             logger.error("API ключ не настроен")
             return None
 
         try:
             params = {
-                "q": city,
+                **self._location_params(city, lat, lon),
                 "appid": self.api_key,
                 "units": "metric",
                 "lang": "ru"
             }
 
-            response = requests.get(
-                f"{self.base_url}/weather",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-
-            data = response.json()
+            data = self._request("weather", params)
             return self._format_current_weather(data)
 
         except requests.exceptions.RequestException as e:
@@ -43,33 +45,112 @@ class WeatherAPI:
             logger.error(f"Ошибка обработки данных: {e}")
             return None
 
-    def get_forecast(self, city: str, days: int = 5) -> Optional[Dict[str, Any]]:
+    def get_forecast(self, city: Optional[str] = None, days: int = 5, lat: Optional[float] = None,
+                     lon: Optional[float] = None) -> Optional[Dict[str, Any]]:
         if not self.api_key:
             logger.error("API ключ не настроен")
             return None
 
         try:
             params = {
-                "q": city,
+                **self._location_params(city, lat, lon),
                 "appid": self.api_key,
                 "units": "metric",
                 "lang": "ru",
                 "cnt": days * 8
             }
 
-            response = requests.get(
-                f"{self.base_url}/forecast",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-
-            data = response.json()
+            data = self._request("forecast", params)
             return self._format_forecast(data)
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Ошибка запроса прогноза: {e}")
             return None
+        except (KeyError, ValueError) as e:
+            logger.error(f"Ошибка обработки данных: {e}")
+            return None
+
+    def get_forecast_series(self, city: Optional[str] = None, hours: int = 24, lat: Optional[float] = None,
+                            lon: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if not self.api_key:
+            logger.error("API ключ не настроен")
+            return None
+
+        try:
+            params = {
+                **self._location_params(city, lat, lon),
+                "appid": self.api_key,
+                "units": "metric",
+                "lang": "ru",
+                "cnt": max(1, -(-hours // 3))
+            }
+
+            data = self._request("forecast", params)
+            return self._format_forecast_series(data)
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Ошибка запроса прогноза: {e}")
+            return None
+        except (KeyError, ValueError) as e:
+            logger.error(f"Ошибка обработки данных: {e}")
+            return None
+
+    def find_city(self, city: str) -> Optional[Dict[str, Any]]:
+        # Возвращает None только если город не найден (404);
+        # сетевые ошибки и лимиты API пробрасываются вызывающему
+        params = {
+            "q": city,
+            "appid": self.api_key,
+            "units": "metric",
+            "lang": "ru"
+        }
+
+        try:
+            data = self._request("weather", params)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+        return self._format_current_weather(data)
+
+    def _request(self, endpoint: str, params: Dict[str, Any]) -> Dict:
+        key = (endpoint,) + tuple(sorted(
+            (k, v.strip().lower() if k == "q" else v)
+            for k, v in params.items() if k != "appid"
+        ))
+        now = time.monotonic()
+
+        with _cache_lock:
+            cached = _cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        response = requests.get(
+            f"{self.base_url}/{endpoint}",
+            params=params,
+            timeout=10
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        with _cache_lock:
+            if len(_cache) >= CACHE_MAX_SIZE:
+                for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                    del _cache[stale]
+                if len(_cache) >= CACHE_MAX_SIZE:
+                    _cache.clear()
+            _cache[key] = (now + CACHE_TTL, data)
+
+        return data
+
+    @staticmethod
+    def _location_params(city: Optional[str], lat: Optional[float], lon: Optional[float]) -> Dict[str, Any]:
+        if lat is not None and lon is not None:
+            return {"lat": round(lat, 4), "lon": round(lon, 4)}
+        if not city:
+            raise ValueError("Не указан город или координаты")
+        return {"q": city}
 
     def _format_current_weather(self, data: Dict) -> Dict[str, Any]:
         return {
@@ -87,7 +168,9 @@ class WeatherAPI:
             "visibility": data.get("visibility", 0),
             "sunrise": data.get("sys", {}).get("sunrise"),
             "sunset": data.get("sys", {}).get("sunset"),
-            "timestamp": data.get("dt")
+            "timestamp": data.get("dt"),
+            "latitude": data.get("coord", {}).get("lat"),
+            "longitude": data.get("coord", {}).get("lon")
         }
 
     def _format_forecast(self, data: Dict) -> Dict[str, Any]:
@@ -119,6 +202,20 @@ class WeatherAPI:
             "forecast": list(forecast_by_day.values())[:5]
         }
 
+    @staticmethod
+    def _format_forecast_series(data: Dict) -> Dict[str, Any]:
+        items = data.get("list", [])
+        return {
+            "city": data["city"]["name"],
+            "timestamps": [item["dt"] for item in items],
+            "temperature": [item["main"]["temp"] for item in items],
+            "wind_speed": [item["wind"]["speed"] for item in items],
+            "precipitation": [
+                item.get("rain", {}).get("3h", 0) + item.get("snow", {}).get("3h", 0)
+                for item in items
+            ]
+        }
+
     @staticmethod
     def _get_wind_direction(degrees: float) -> str:
         directions = ["С", "СВ", "В", "ЮВ", "Ю", "ЮЗ", "З", "СЗ"]
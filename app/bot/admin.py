@@ -0,0 +1,351 @@
+import io
+import sys
+import csv
+import json
+import logging
+import time
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+from app.api.weather import WeatherAPI
+from app.database import db
+
+COLUMNS = ["telegram_id", "username", "first_name", "city", "notification_time", "latitude", "longitude"]
+
+EXPORT_QUERY = """
+    SELECT u.telegram_id, u.username, u.first_name, s.city, s.notification_time, s.latitude, s.longitude
+    FROM subscriptions s
+    JOIN users u ON s.user_id = u.id
+    ORDER BY s.id
+"""
+
+# Разделитель и кавычка, которые не встречаются в JSON: строки выводятся как есть
+NDJSON_COPY_OPTIONS = "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'"
+
+MAX_REPORTED_ERRORS = 20
+
+MAX_NAME_LENGTH = 100
+BIGINT_MIN, BIGINT_MAX = -2 ** 63, 2 ** 63 - 1
+
+RESOLVE_RETRIES = 3
+RESOLVE_BACKOFF = 2.0
+
+
+def detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def open_stream(path: str, mode: str):
+    if path == "-":
+        return sys.stdin if "r" in mode else sys.stdout
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def export_subscriptions(path: str, fmt: str) -> bool:
+    conn = db.get_db_connection()
+    if not conn:
+        return False
+
+    out = None
+    try:
+        if fmt == "ndjson":
+            sql = f"COPY (SELECT row_to_json(t)::text FROM ({EXPORT_QUERY}) t) TO STDOUT WITH ({NDJSON_COPY_OPTIONS})"
+        else:
+            sql = f"COPY ({EXPORT_QUERY}) TO STDOUT WITH (FORMAT csv, HEADER)"
+
+        out = open_stream(path, "w")
+        cur = conn.cursor()
+        cur.copy_expert(sql, out)
+        logger.info(f"Экспортировано подписок: {cur.rowcount}")
+        cur.close()
+        return True
+
+    except Exception as e:
+        logger.error(f"Ошибка экспорта подписок: {e}")
+        return False
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+        conn.close()
+
+
+def read_rows(path: str, fmt: str) -> Iterator[Dict]:
+    stream = open_stream(path, "r")
+    try:
+        if fmt == "ndjson":
+            for line in stream:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield {}
+        else:
+            yield from csv.DictReader(stream)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def parse_telegram_id(value) -> int:
+    if isinstance(value, bool):
+        raise ValueError("telegram_id не может быть логическим значением")
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError("telegram_id должен быть целым")
+        value = int(value)
+
+    telegram_id = int(value)
+    if not BIGINT_MIN <= telegram_id <= BIGINT_MAX:
+        raise ValueError("telegram_id вне диапазона BIGINT")
+    return telegram_id
+
+
+def clean_name(value) -> Optional[str]:
+    if value in (None, ""):
+        return None
+    return str(value)[:MAX_NAME_LENGTH]
+
+
+def validate_row(row: Dict) -> Optional[List]:
+    try:
+        telegram_id = parse_telegram_id(row["telegram_id"])
+        city = (row.get("city") or "").strip()
+        time_str = datetime.strptime((row.get("notification_time") or "").strip(), "%H:%M").strftime("%H:%M")
+
+        latitude = row.get("latitude")
+        longitude = row.get("longitude")
+        if latitude in (None, "") or longitude in (None, ""):
+            latitude = longitude = None
+        else:
+            latitude, longitude = float(latitude), float(longitude)
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return None
+
+        if not city or len(city) > 100:
+            return None
+
+        return [
+            telegram_id,
+            clean_name(row.get("username")),
+            clean_name(row.get("first_name")),
+            city,
+            time_str,
+            latitude,
+            longitude,
+        ]
+
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+def resolve_city(weather_api: WeatherAPI, name: str) -> Optional[Tuple[str, float, float]]:
+    for attempt in range(1, RESOLVE_RETRIES + 1):
+        try:
+            weather_data = weather_api.find_city(name)
+            if not weather_data:
+                return None
+            return weather_data["city"], weather_data["latitude"], weather_data["longitude"]
+        except requests.exceptions.RequestException as e:
+            status = getattr(e.response, "status_code", None)
+            if status is not None and 400 <= status < 500 and status != 429:
+                raise RuntimeError(f"Не удалось проверить город {name}: {e}") from e
+            if attempt == RESOLVE_RETRIES:
+                raise RuntimeError(f"Не удалось проверить город {name}: {e}") from e
+            logger.warning(f"Ошибка проверки города {name} (попытка {attempt}): {e}")
+            time.sleep(RESOLVE_BACKOFF * attempt)
+
+
+def resolve_cities(executor: ThreadPoolExecutor, weather_api: WeatherAPI, names: List[str],
+                   resolved: Dict[str, Optional[Tuple[str, float, float]]]):
+    pending = {name.lower(): name for name in names if name.lower() not in resolved}
+    for key, city in zip(pending, executor.map(lambda n: resolve_city(weather_api, n), pending.values())):
+        resolved[key] = city
+
+
+def load_known_cities(cur) -> Dict[str, Optional[Tuple[str, float, float]]]:
+    # Города существующих подписок уже проверены при создании
+    cur.execute("""
+        SELECT DISTINCT ON (lower(city)) city, latitude, longitude
+        FROM subscriptions
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        ORDER BY lower(city), id
+    """)
+    return {city.lower(): (city, latitude, longitude) for city, latitude, longitude in cur.fetchall()}
+
+
+def copy_batch(cur, batch: List[List]):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY import_subscriptions ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def import_subscriptions(path: str, fmt: str, batch_size: int, resolve: bool, workers: int) -> bool:
+    weather_api = WeatherAPI()
+    if resolve and not weather_api.api_key:
+        logger.error("API ключ не настроен: нельзя проверить города (используйте --no-resolve)")
+        return False
+
+    conn = db.get_db_connection()
+    if not conn:
+        return False
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    total = skipped = 0
+
+    try:
+        cur = conn.cursor()
+        resolved = load_known_cities(cur) if resolve else {}
+        cur.execute("""
+            CREATE TEMP TABLE import_subscriptions (
+                telegram_id BIGINT NOT NULL,
+                username VARCHAR(100),
+                first_name VARCHAR(100),
+                city VARCHAR(100) NOT NULL,
+                notification_time VARCHAR(5) NOT NULL,
+                latitude REAL,
+                longitude REAL
+            ) ON COMMIT DROP
+        """)
+
+        def flush(batch: List[List]):
+            nonlocal skipped
+            if resolve:
+                resolve_cities(executor, weather_api, [row[3] for row in batch if row[5] is None], resolved)
+
+            rows = []
+            for row in batch:
+                if resolve and row[5] is None:
+                    match = resolved.get(row[3].lower())
+                    if not match:
+                        skipped += 1
+                        if skipped <= MAX_REPORTED_ERRORS:
+                            logger.warning(f"Город не найден, подписка пропущена: {row}")
+                        continue
+                    row[3], row[5], row[6] = match
+                rows.append(row)
+
+            if rows:
+                copy_batch(cur, rows)
+
+        batch = []
+        for line_no, row in enumerate(read_rows(path, fmt), 1):
+            total += 1
+            values = validate_row(row)
+            if values is None:
+                skipped += 1
+                if skipped <= MAX_REPORTED_ERRORS:
+                    logger.warning(f"Строка {line_no} пропущена: {row}")
+                continue
+
+            batch.append(values)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+
+        if batch:
+            flush(batch)
+
+        cur.execute("""
+            INSERT INTO users (telegram_id, username, first_name)
+            SELECT DISTINCT ON (telegram_id) telegram_id, username, first_name
+            FROM import_subscriptions
+            ORDER BY telegram_id
+            ON CONFLICT (telegram_id)
+            DO UPDATE SET
+                username = COALESCE(EXCLUDED.username, users.username),
+                first_name = COALESCE(EXCLUDED.first_name, users.first_name)
+        """)
+
+        cur.execute("""
+            INSERT INTO subscriptions (user_id, city, notification_time, latitude, longitude)
+            SELECT DISTINCT u.id, i.city, i.notification_time, i.latitude, i.longitude
+            FROM import_subscriptions i
+            JOIN users u ON u.telegram_id = i.telegram_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM subscriptions s
+                WHERE s.user_id = u.id
+                  AND s.city = i.city
+                  AND s.notification_time = i.notification_time
+                  AND s.latitude IS NOT DISTINCT FROM i.latitude
+                  AND s.longitude IS NOT DISTINCT FROM i.longitude
+            )
+        """)
+        imported = cur.rowcount
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        logger.info(f"Прочитано строк: {total}, импортировано подписок: {imported}, пропущено: {skipped}")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        logger.error(f"Ошибка импорта подписок: {e}")
+        return False
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт и экспорт подписок")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Выгрузить подписки")
+    export_parser.add_argument("path", help="Файл или - для stdout")
+    export_parser.add_argument("--format", choices=["csv", "ndjson"])
+
+    import_parser = subparsers.add_parser("import", help="Загрузить подписки")
+    import_parser.add_argument("path", help="Файл или - для stdin")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"])
+    import_parser.add_argument("--batch-size", type=int, default=10000)
+    import_parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Число параллельных запросов при проверке городов"
+    )
+    import_parser.add_argument(
+        "--no-resolve",
+        action="store_true",
+        help="Не проверять названия городов через OpenWeatherMap"
+    )
+
+    args = parser.parse_args()
+    fmt = detect_format(args.path, args.format)
+
+    if args.command == "export":
+        ok = export_subscriptions(args.path, fmt)
+    else:
+        ok = import_subscriptions(
+            args.path, fmt, max(1, args.batch_size), not args.no_resolve, max(1, args.workers)
+        )
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
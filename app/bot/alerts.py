@@ -0,0 +1,200 @@
+import math
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VARIABLES = ("temperature", "wind_speed", "precipitation")
+VAR_TEMPERATURE, VAR_WIND_SPEED, VAR_PRECIPITATION = range(len(VARIABLES))
+
+STEP_SECONDS = 3 * 3600
+
+# Сколько часов прогноза запрашивается у API: горизонт любого правила не больше этого
+MAX_HORIZON_HOURS = 24
+FORECAST_HOURS = MAX_HORIZON_HOURS + 6
+
+# sign = 1: значение > порога, sign = -1: значение < порога.
+# param указывает, что задаёт пользователь: порог или горизонт в часах.
+ALERT_KINDS = {
+    "rain": {
+        "variable": VAR_PRECIPITATION,
+        "sign": 1,
+        "threshold": 0.0,
+        "horizon": 3,
+        "param": "horizon",
+        "range": (1, MAX_HORIZON_HOURS),
+        "title": "🌧 Дождь",
+    },
+    "frost": {
+        "variable": VAR_TEMPERATURE,
+        "sign": -1,
+        "threshold": 0.0,
+        "horizon": 12,
+        "param": "threshold",
+        "range": (-50, 10),
+        "title": "🥶 Заморозки",
+    },
+    "wind": {
+        "variable": VAR_WIND_SPEED,
+        "sign": 1,
+        "threshold": 15.0,
+        "horizon": 24,
+        "param": "threshold",
+        "range": (1, 60),
+        "title": "💨 Сильный ветер",
+    },
+}
+
+
+def is_valid_param(kind: str, value: float) -> bool:
+    low, high = ALERT_KINDS[kind]["range"]
+    return math.isfinite(value) and low <= value <= high
+
+
+class CompiledRules:
+    def __init__(self, cities: List[str], predicates: np.ndarray, inverse: np.ndarray,
+                 owners: List[Tuple[int, str]], params: List[float]):
+        # predicates: уникальные строки (город, переменная, знак, порог, горизонт)
+        self.cities = cities
+        self.predicates = predicates
+        self.inverse = inverse
+        self.owners = owners
+        self.params = params
+
+    def __len__(self):
+        return len(self.owners)
+
+
+def compile_rules(rules: Sequence[Tuple[int, str, str, Optional[float]]]) -> CompiledRules:
+    cities = []
+    city_index = {}
+    rows = []
+    owners = []
+    params = []
+
+    for telegram_id, city, kind, param in rules:
+        spec = ALERT_KINDS.get(kind)
+        if spec is None:
+            logger.warning(f"Неизвестный тип оповещения: {kind}")
+            continue
+
+        key = city.strip().lower()
+        if key not in city_index:
+            city_index[key] = len(cities)
+            cities.append(city.strip())
+
+        threshold = spec["threshold"]
+        horizon = spec["horizon"]
+        if param is not None:
+            if not is_valid_param(kind, float(param)):
+                logger.warning(f"Недопустимый параметр оповещения {kind}: {param}")
+                continue
+            if spec["param"] == "horizon":
+                horizon = float(param)
+            else:
+                threshold = float(param)
+
+        rows.append((city_index[key], spec["variable"], spec["sign"], threshold, horizon))
+        owners.append((telegram_id, kind))
+        params.append(horizon if spec["param"] == "horizon" else threshold)
+
+    table = np.asarray(rows, dtype=np.float64).reshape(-1, 5)
+    if len(table):
+        predicates, inverse = np.unique(table, axis=0, return_inverse=True)
+    else:
+        predicates, inverse = table, np.empty(0, dtype=np.intp)
+
+    return CompiledRules(cities, predicates, inverse.reshape(-1), owners, params)
+
+
+def stack_forecasts(cities: Sequence[str],
+                    forecasts: Dict[str, Optional[Dict[str, Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+    steps = max((len(f["timestamps"]) for f in forecasts.values() if f), default=0)
+    timestamps = np.full((len(cities), steps), np.nan)
+    values = np.full((len(cities), steps, len(VARIABLES)), np.nan)
+
+    for i, city in enumerate(cities):
+        forecast = forecasts.get(city)
+        if not forecast:
+            continue
+        n = len(forecast["timestamps"])
+        timestamps[i, :n] = forecast["timestamps"]
+        for v, name in enumerate(VARIABLES):
+            values[i, :n, v] = forecast[name]
+
+    return timestamps, values
+
+
+def evaluate(compiled: CompiledRules, timestamps: np.ndarray, values: np.ndarray,
+             now: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    predicates = compiled.predicates
+    steps = timestamps.shape[1]
+    if not len(predicates) or not steps:
+        empty = np.zeros(len(predicates))
+        return empty.astype(bool), empty, empty
+
+    city = predicates[:, 0].astype(np.intp)
+    variable = predicates[:, 1].astype(np.intp)
+    sign = predicates[:, 2]
+    threshold = predicates[:, 3]
+    horizon = predicates[:, 4]
+
+    series = values[city, :, variable] * sign[:, None]
+    hits = series > (threshold * sign)[:, None]
+
+    ts = timestamps[city]
+    window = (ts + STEP_SECONDS > now) & (ts <= now + horizon[:, None] * 3600)
+    active = hits & window
+
+    fired = active.any(axis=1)
+    first = active.argmax(axis=1)
+
+    # Событие длится, пока предикат выполняется подряд, даже за пределами горизонта
+    breaks = ~hits & (np.arange(steps) > first[:, None])
+    last = np.where(breaks.any(axis=1), breaks.argmax(axis=1) - 1, steps - 1)
+
+    rows = np.arange(len(predicates))
+    starts = ts[rows, first]
+    ends = ts[rows, last] + STEP_SECONDS
+    return fired, starts, ends
+
+
+class AlertEngine:
+    def __init__(self):
+        self._sent: Dict[Tuple[int, str, str], float] = {}
+
+    def collect_alerts(self, compiled: CompiledRules, timestamps: np.ndarray,
+                       values: np.ndarray, now: float) -> List[Dict[str, Any]]:
+        self._sent = {key: end for key, end in self._sent.items() if end > now}
+
+        fired, starts, ends = evaluate(compiled, timestamps, values, now)
+        if not fired.any():
+            return []
+
+        predicate_of = compiled.inverse
+        alerts = []
+        for r in np.flatnonzero(fired[predicate_of]):
+            p = predicate_of[r]
+            telegram_id, kind = compiled.owners[r]
+            city = compiled.cities[int(compiled.predicates[p, 0])]
+            start, end = float(starts[p]), float(ends[p])
+
+            key = (telegram_id, city.lower(), kind)
+            sent_until = self._sent.get(key)
+            if sent_until is not None and start <= sent_until:
+                self._sent[key] = max(sent_until, end)
+                continue
+
+            self._sent[key] = end
+            alerts.append({
+                "telegram_id": telegram_id,
+                "city": city,
+                "kind": kind,
+                "param": compiled.params[r],
+                "start": start,
+                "end": end,
+            })
+
+        return alerts
@@ -2,7 +2,10 @@ import logging
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
+from app.api import geo
 from app.api.weather import WeatherAPI
+from app.bot import messages
+from app.bot.alerts import ALERT_KINDS, is_valid_param
 from app.database import db
 
 logger = logging.getLogger(__name__)
@@ -32,6 +35,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"• /subscribe Москва 08:30\n"
         f"• /mysubs - мои подписки\n"
         f"• /unsubscribe 1 - удалить подписку\n\n"
+        f"⚠️ *Оповещения:*\n"
+        f"• /alert rain Москва - дождь в ближайшие 3 часа\n"
+        f"• /myalerts - мои оповещения\n\n"
         f"📖 *Помощь:* /help"
     )
 
@@ -51,9 +57,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         "🔔 *Подписки на уведомления:*\n"
         "• /subscribe <город> <время>\n"
+        "• Или отправьте геопозицию и /subscribe <время>\n"
         "• /mysubs - список подписок\n"
         "• /unsubscribe <номер> - удалить подписку\n\n"
 
+        "⚠️ *Оповещения о погоде:*\n"
+        "• /alert rain <город> [часов] - осадки\n"
+        "• /alert frost <город> [°C] - заморозки\n"
+        "• /alert wind <город> [м/с] - сильный ветер\n"
+        "• /myalerts - список оповещений\n"
+        "• /unalert <ID> - удалить оповещение\n\n"
+
         "📍 *Примеры:*\n"
         "• /weather Санкт-Петербург\n"
         "• /forecast Лондон\n"
@@ -82,20 +96,10 @@ async def weather_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     weather_data = weather_api.get_current_weather(city)
 
     if weather_data:
-        message = (
-            f"🌤️ *{weather_data['city']}, {weather_data.get('country', '')}*\n\n"
-            f"🌡️ Температура: *{weather_data['temperature']:.1f}°C*\n"
-            f"🤏 Ощущается как: *{weather_data['feels_like']:.1f}°C*\n"
-            f"💧 Влажность: *{weather_data['humidity']}%*\n"
-            f"💨 Ветер: *{weather_data['wind_speed']} м/с*\n"
-            f"📝 *{weather_data['weather']}*"
-        )
+        message = messages.render_weather("current", weather_data)
     else:
-        message = (
-            f"❌ Город *{city}* не найден.\n"
-            f"Проверьте правильность написания."
-        )
-    await update.message.reply_text(message, parse_mode='Markdown')
+        message = messages.render_not_found(city)
+    await update.message.reply_text(message, parse_mode=messages.PARSE_MODE)
 
 
 async def handle_city_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -106,20 +110,31 @@ async def handle_city_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     weather_data = weather_api.get_current_weather(city)
 
     if weather_data:
-        message = (
-            f"🌤️ *{weather_data['city']}, {weather_data.get('country', '')}*\n\n"
-            f"🌡️ Температура: *{weather_data['temperature']:.1f}°C*\n"
-            f"🤏 Ощущается как: *{weather_data['feels_like']:.1f}°C*\n"
-            f"💧 Влажность: *{weather_data['humidity']}%*\n"
-            f"💨 Ветер: *{weather_data['wind_speed']} м/с*\n"
-            f"📝 *{weather_data['weather']}*"
-        )
+        message = messages.render_weather("current", weather_data)
     else:
-        message = (
-            f"❌ Город *{city}* не найден.\n"
-            f"Проверьте правильность написания."
-        )
-    await update.message.reply_text(message, parse_mode='Markdown')
+        message = messages.render_not_found(city)
+    await update.message.reply_text(message, parse_mode=messages.PARSE_MODE)
+
+
+async def handle_location_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    location = update.effective_message.location
+    await update.effective_message.reply_chat_action(action="typing")
+
+    _, lat, lon = geo.snap(location.latitude, location.longitude)
+
+    weather_api = WeatherAPI()
+    weather_data = weather_api.get_current_weather(lat=lat, lon=lon)
+
+    if weather_data:
+        context.user_data["location"] = {
+            "city": weather_data["city"],
+            "latitude": location.latitude,
+            "longitude": location.longitude
+        }
+        message = messages.render_weather("location", weather_data)
+    else:
+        message = messages.render_location_error()
+    await update.effective_message.reply_text(message, parse_mode=messages.PARSE_MODE)
 
 
 async def forecast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -140,7 +155,11 @@ async def forecast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     forecast_data = weather_api.get_forecast(city, days=5)
 
     if forecast_data:
-        message = f"📅 *Прогноз {forecast_data['city']}, {forecast_data.get('country', '')}:*\n\n"
+        message = messages.render(
+            "forecast_header",
+            city=forecast_data['city'],
+            country=forecast_data.get('country', '')
+        )
 
         for day in forecast_data.get('forecast', [])[:5]:
             try:
@@ -149,30 +168,46 @@ async def forecast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except:
                 date_str = day['date']
 
-            message += (
-                f"*{date_str}* ({day.get('day_name', '')})\n"
-                f"🌡️ {day['temp_min']:.0f}°...{day['temp_max']:.0f}°C\n"
-                f"📝 {day['weather'].capitalize()}\n\n"
+            message += messages.render(
+                "forecast_day",
+                date=date_str,
+                day_name=day.get('day_name', ''),
+                temp_min=f"{day['temp_min']:.0f}",
+                temp_max=f"{day['temp_max']:.0f}",
+                weather=day['weather'].capitalize()
             )
     else:
-        message = f"❌ Не удалось получить прогноз для *{city}*"
-    await update.message.reply_text(message, parse_mode='Markdown')
+        message = messages.render("forecast_error", city=city)
+    await update.message.reply_text(message, parse_mode=messages.PARSE_MODE)
 
 
 async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not context.args or len(context.args) < 2:
+    location = None
+    if context.args and len(context.args) == 1:
+        try:
+            datetime.strptime(context.args[0], "%H:%M")
+            location = context.user_data.get("location")
+        except ValueError:
+            pass
+
+    if not context.args or (len(context.args) < 2 and not location):
         await update.message.reply_text(
             "📍 *Использование:*\n"
             "/subscribe <город> <время>\n\n"
             "*Пример:*\n"
             "/subscribe Москва 08:30\n"
-            "/subscribe Санкт-Петербург 19:00",
+            "/subscribe Санкт-Петербург 19:00\n\n"
+            "Или отправьте геопозицию, а затем /subscribe <время>",
             parse_mode='Markdown'
         )
         return
 
-    city = context.args[0]
-    time_str = context.args[1]
+    if location:
+        city = location["city"]
+        time_str = context.args[0]
+    else:
+        city = context.args[0]
+        time_str = context.args[1]
 
     try:
         datetime.strptime(time_str, "%H:%M")
@@ -185,25 +220,31 @@ async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    weather_api = WeatherAPI()
-    if not weather_api.get_current_weather(city):
-        await update.message.reply_text(
-            f"❌ Город *{city}* не найден.\n"
-            f"Проверьте правильность написания.",
-            parse_mode='Markdown'
-        )
-        return
+    if location:
+        latitude, longitude = location["latitude"], location["longitude"]
+    else:
+        weather_api = WeatherAPI()
+        weather_data = weather_api.get_current_weather(city)
+        if not weather_data:
+            await update.message.reply_text(
+                messages.render_not_found(city),
+                parse_mode=messages.PARSE_MODE
+            )
+            return
+        # Координаты города кладут подписку в общую ячейку сетки с соседями
+        latitude, longitude = weather_data["latitude"], weather_data["longitude"]
 
     user = update.effective_user
-    subscription_id = db.add_subscription(user.id, city, time_str)
+    subscription_id = db.add_subscription(
+        user.id, city, time_str,
+        latitude=latitude,
+        longitude=longitude
+    )
 
     if subscription_id:
         await update.message.reply_text(
-            f"✅ *Подписка создана!*\n\n"
-            f"📍 Город: *{city}*\n"
-            f"⏰ Время: *{time_str}*\n\n"
-            f"ID подписки: `{subscription_id}`\n",
-            parse_mode='Markdown'
+            messages.render("subscription_created", city=city, time=time_str, id=subscription_id),
+            parse_mode=messages.PARSE_MODE
         )
     else:
         await update.message.reply_text(
@@ -227,15 +268,14 @@ async def mysubs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    message = "📋 *Ваши подписки:*\n\n"
+    message = messages.render("subscriptions_header")
 
     for i, (sub_id, city, time_str) in enumerate(subscriptions, 1):
-        message += f"{i}. *{city}* в {time_str}\n"
-        message += f"   ID: `{sub_id}`\n\n"
+        message += messages.render("subscription_item", index=i, city=city, time=time_str, id=sub_id)
 
-    message += "🗑️ *Удалить:* /unsubscribe <ID>"
+    message += messages.render("subscriptions_footer")
 
-    await update.message.reply_text(message, parse_mode='Markdown')
+    await update.message.reply_text(message, parse_mode=messages.PARSE_MODE)
 
 
 async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -266,4 +306,125 @@ async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text(
             f"❌ Подписка *{subscription_id}* не найдена",
             parse_mode='Markdown'
-        )
\ No newline at end of file
+        )
+
+
+async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or len(context.args) < 2 or context.args[0].lower() not in ALERT_KINDS:
+        await update.message.reply_text(
+            "📍 *Использование:*\n"
+            "/alert <тип> <город> [порог]\n\n"
+            "*Типы:*\n"
+            "• rain - осадки в ближайшие N часов (по умолчанию 3, не больше 24)\n"
+            "• frost - температура ниже N °C (по умолчанию 0)\n"
+            "• wind - ветер сильнее N м/с (по умолчанию 15)\n\n"
+            "*Пример:*\n"
+            "/alert rain Москва\n"
+            "/alert wind Санкт-Петербург 12",
+            parse_mode='Markdown'
+        )
+        return
+
+    kind = context.args[0].lower()
+    city_args = context.args[1:]
+    threshold = None
+
+    if len(city_args) > 1:
+        try:
+            threshold = float(city_args[-1].replace(",", "."))
+            city_args = city_args[:-1]
+        except ValueError:
+            pass
+
+    city = " ".join(city_args)
+
+    if threshold is not None and not is_valid_param(kind, threshold):
+        low, high = ALERT_KINDS[kind]["range"]
+        await update.message.reply_text(
+            f"❌ *Недопустимое значение порога*\n"
+            f"Для {kind} укажите число от {low} до {high}",
+            parse_mode='Markdown'
+        )
+        return
+
+    weather_api = WeatherAPI()
+    weather_data = weather_api.get_current_weather(city)
+    if not weather_data:
+        await update.message.reply_text(
+            messages.render_not_found(city),
+            parse_mode=messages.PARSE_MODE
+        )
+        return
+
+    city = weather_data["city"]
+    user = update.effective_user
+    rule_id = db.add_alert_rule(user.id, city, kind, threshold)
+
+    if rule_id:
+        await update.message.reply_text(
+            messages.render("alert_created", title=ALERT_KINDS[kind]['title'], city=city, id=rule_id),
+            parse_mode=messages.PARSE_MODE
+        )
+    else:
+        await update.message.reply_text(
+            "❌ *Ошибка создания оповещения*",
+            parse_mode='Markdown'
+        )
+
+
+async def myalerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    rules = db.get_user_alert_rules(user.id)
+
+    if not rules:
+        await update.message.reply_text(
+            "📭 *У вас нет оповещений.*\n\n"
+            "Чтобы создать оповещение:\n"
+            "/alert <тип> <город> [порог]\n\n"
+            "*Пример:*\n"
+            "/alert rain Москва",
+            parse_mode='Markdown'
+        )
+        return
+
+    message = messages.render("alerts_header")
+
+    for i, (rule_id, city, kind, threshold) in enumerate(rules, 1):
+        title = ALERT_KINDS[kind]['title'] if kind in ALERT_KINDS else kind
+        suffix = f" ({threshold:g})" if threshold is not None else ""
+        message += messages.render("alert_item", index=i, title=title, suffix=suffix, city=city, id=rule_id)
+
+    message += messages.render("alerts_footer")
+
+    await update.message.reply_text(message, parse_mode=messages.PARSE_MODE)
+
+
+async def unalert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text(
+            "📍 *Укажите ID оповещения:*\n"
+            "/unalert <ID>\n\n"
+            "ID можно узнать через /myalerts",
+            parse_mode='Markdown'
+        )
+        return
+
+    try:
+        rule_id = int(context.args[0])
+    except ValueError:
+        await update.message.reply_text(
+            "❌ *ID должен быть числом*",
+            parse_mode='Markdown'
+        )
+        return
+
+    if db.delete_alert_rule(update.effective_user.id, rule_id):
+        await update.message.reply_text(
+            f"✅ Оповещение *{rule_id}* удалено",
+            parse_mode='Markdown'
+        )
+    else:
+        await update.message.reply_text(
+            f"❌ Оповещение *{rule_id}* не найдено",
+            parse_mode='Markdown'
+        )
@@ -20,7 +20,11 @@ from app.bot.handlers import (
     subscribe_command,
     mysubs_command,
     unsubscribe_command,
-    handle_city_message
+    alert_command,
+    myalerts_command,
+    unalert_command,
+    handle_city_message,
+    handle_location_message
 )
 
 from app.database import db
@@ -60,7 +64,11 @@ def main():
     app.add_handler(CommandHandler("subscribe", subscribe_command))
     app.add_handler(CommandHandler("mysubs", mysubs_command))
     app.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+    app.add_handler(CommandHandler("alert", alert_command))
+    app.add_handler(CommandHandler("myalerts", myalerts_command))
+    app.add_handler(CommandHandler("unalert", unalert_command))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_city_message))
+    app.add_handler(MessageHandler(filters.LOCATION & filters.UpdateType.MESSAGE, handle_location_message))
 
     logger.info("Запуск сервиса уведомлений...")
     if start_notifier(app):
@@ -0,0 +1,123 @@
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+PARSE_MODE = "MarkdownV2"
+# WeatherAPI запрашивает описания погоды на русском, поэтому шаблоны пока только русские
+DEFAULT_LOCALE = "ru"
+
+CACHE_MAX_SIZE = 4096
+
+_ESCAPE_RE = re.compile(r"([_*\[\]()~`>#+\-=|{}.!\\])")
+
+WEATHER_FIELDS = ("city", "country", "temperature", "feels_like", "humidity", "wind_speed", "weather")
+
+# Статический текст шаблонов уже экранирован для MarkdownV2,
+# экранируются только подставляемые значения.
+_WEATHER_BODY = (
+    "🌡️ Температура: *{temperature}°C*\n"
+    "🤏 Ощущается как: *{feels_like}°C*\n"
+    "💧 Влажность: *{humidity}%*\n"
+    "💨 Ветер: *{wind_speed} м/с*\n"
+    "📝 *{weather}*"
+)
+
+_ALERT_FOOTER = "\n⏰ С {start} до {end}"
+
+TEMPLATES = {
+    ("current", "ru"): ("🌤️ *{city}, {country}*\n\n" + _WEATHER_BODY).format,
+    ("location", "ru"): (
+        "🌤️ *{city}, {country}*\n\n" + _WEATHER_BODY +
+        "\n\n🔔 Подписаться на уведомления для этой точки:\n/subscribe 08:30"
+    ).format,
+    ("notification", "ru"): ("⏰ *{city}, {country}*\n\n" + _WEATHER_BODY + "\n\nХорошего дня\\! ☀").format,
+    ("not_found", "ru"): "❌ Город *{city}* не найден\\.\nПроверьте правильность написания\\.".format,
+    ("location_error", "ru"): "❌ Не удалось получить погоду для этой точки\\.".format,
+    ("forecast_header", "ru"): "📅 *Прогноз {city}, {country}:*\n\n".format,
+    ("forecast_day", "ru"): "*{date}* \\({day_name}\\)\n🌡️ {temp_min}°\\.\\.\\.{temp_max}°C\n📝 {weather}\n\n".format,
+    ("forecast_error", "ru"): "❌ Не удалось получить прогноз для *{city}*".format,
+    ("subscription_created", "ru"): (
+        "✅ *Подписка создана\\!*\n\n"
+        "📍 Город: *{city}*\n"
+        "⏰ Время: *{time}*\n\n"
+        "ID подписки: `{id}`\n"
+    ).format,
+    ("subscriptions_header", "ru"): "📋 *Ваши подписки:*\n\n".format,
+    ("subscription_item", "ru"): "{index}\\. *{city}* в {time}\n   ID: `{id}`\n\n".format,
+    ("subscriptions_footer", "ru"): "🗑️ *Удалить:* /unsubscribe <ID\\>".format,
+    ("alert_created", "ru"): (
+        "✅ *Оповещение создано\\!*\n\n"
+        "{title}\n"
+        "📍 Город: *{city}*\n\n"
+        "ID оповещения: `{id}`\n"
+    ).format,
+    ("alerts_header", "ru"): "📋 *Ваши оповещения:*\n\n".format,
+    ("alert_item", "ru"): "{index}\\. {title}{suffix}: *{city}*\n   ID: `{id}`\n\n".format,
+    ("alerts_footer", "ru"): "🗑️ *Удалить:* /unalert <ID\\>".format,
+    ("alert_rain", "ru"): ("🌧 Дождь: *{city}*\n\nОжидаются осадки в ближайшие {param} ч" + _ALERT_FOOTER).format,
+    ("alert_frost", "ru"): ("🥶 Заморозки: *{city}*\n\nОжидается температура ниже {param}°C" + _ALERT_FOOTER).format,
+    ("alert_wind", "ru"): ("💨 Сильный ветер: *{city}*\n\nОжидается ветер сильнее {param} м/с" + _ALERT_FOOTER).format,
+}
+
+_cache: "OrderedDict[Tuple, str]" = OrderedDict()
+
+
+def escape(value: Any) -> str:
+    return _ESCAPE_RE.sub(r"\\\1", str(value))
+
+
+def snapshot_version(weather_data: Dict[str, Any]) -> Tuple:
+    return tuple(weather_data.get(field) for field in WEATHER_FIELDS)
+
+
+def _template(kind: str, locale: str):
+    return TEMPLATES.get((kind, locale)) or TEMPLATES[(kind, DEFAULT_LOCALE)]
+
+
+def render(kind: str, locale: str = DEFAULT_LOCALE, **values: Any) -> str:
+    return _template(kind, locale)(**{name: escape(value) for name, value in values.items()})
+
+
+def render_weather(kind: str, weather_data: Dict[str, Any], locale: str = DEFAULT_LOCALE) -> str:
+    key = (kind, locale, snapshot_version(weather_data))
+
+    text = _cache.get(key)
+    if text is not None:
+        _cache.move_to_end(key)
+        return text
+
+    text = render(
+        kind, locale,
+        city=weather_data["city"],
+        country=weather_data.get("country", ""),
+        temperature=f"{weather_data['temperature']:.1f}",
+        feels_like=f"{weather_data['feels_like']:.1f}",
+        humidity=weather_data["humidity"],
+        wind_speed=weather_data["wind_speed"],
+        weather=weather_data["weather"]
+    )
+
+    _cache[key] = text
+    if len(_cache) > CACHE_MAX_SIZE:
+        _cache.popitem(last=False)
+
+    return text
+
+
+def render_not_found(city: str, locale: str = DEFAULT_LOCALE) -> str:
+    return render("not_found", locale, city=city)
+
+
+def render_location_error(locale: str = DEFAULT_LOCALE) -> str:
+    return render("location_error", locale)
+
+
+def render_alert(alert: Dict[str, Any], locale: str = DEFAULT_LOCALE) -> str:
+    return render(
+        f"alert_{alert['kind']}", locale,
+        city=alert["city"],
+        param=f"{alert['param']:g}",
+        start=datetime.fromtimestamp(alert["start"]).strftime("%H:%M"),
+        end=datetime.fromtimestamp(alert["end"]).strftime("%H:%M")
+    )
@@ -1,35 +1,42 @@
 import logging
 import asyncio
+import time
 from datetime import datetime
+from app.api import geo
 from app.api.weather import WeatherAPI
-from app.database.db import get_db_connection
+from app.bot import messages
+from app.bot.alerts import AlertEngine, FORECAST_HOURS, compile_rules, stack_forecasts
+from app.database.db import get_db_connection, get_all_alert_rules
 
 logger = logging.getLogger(__name__)
 
+ALERT_CHECK_INTERVAL = 30 * 60
+FETCH_CONCURRENCY = 10
+
 
 class JobQueueNotifier:
     def __init__(self):
         self.weather_api = WeatherAPI()
+        self.alert_engine = AlertEngine()
         logger.info("JobQueueNotifier инициализирован")
 
-    async def send_weather_notification(self, bot, chat_id: int, city: str):
-        try:
-            weather_data = self.weather_api.get_current_weather(city)
-            if weather_data:
-                message = (
-                    f"⏰ *{weather_data['city']}, {weather_data.get('country', '')}*\n\n"
-                    f"🌡️ Температура: *{weather_data['temperature']:.1f}°C*\n"
-                    f"🤏 Ощущается как: *{weather_data['feels_like']:.1f}°C*\n"
-                    f"💧 Влажность: *{weather_data['humidity']}%*\n"
-                    f"💨 Ветер: *{weather_data['wind_speed']} м/с*\n"
-                    f"📝 *{weather_data['weather']}*\n\n"
-                    f"Хорошего дня! ☀"
-                )
+    def fetch_weather(self, city: str, latitude=None, longitude=None):
+        if latitude is not None and longitude is not None:
+            _, lat, lon = geo.snap(latitude, longitude)
+            return self.weather_api.get_current_weather(lat=lat, lon=lon)
+        return self.weather_api.get_current_weather(city)
 
+    async def send_weather_notification(self, bot, chat_id: int, city: str, message: str = None):
+        try:
+            if message is None:
+                weather_data = self.weather_api.get_current_weather(city)
+                if weather_data:
+                    message = messages.render_weather("notification", weather_data)
+            if message:
                 await bot.send_message(
                     chat_id=chat_id,
                     text=message,
-                    parse_mode='Markdown'
+                    parse_mode=messages.PARSE_MODE
                 )
 
                 logger.info(f"Уведомление отправлено в {chat_id} для {city}")
@@ -50,7 +57,7 @@ class JobQueueNotifier:
 
             cur = conn.cursor()
             cur.execute("""
-                SELECT u.telegram_id, s.city, s.notification_time
+                SELECT u.telegram_id, s.city, s.latitude, s.longitude
                 FROM subscriptions s
                 JOIN users u ON s.user_id = u.id
                 WHERE s.notification_time = %s
@@ -66,13 +73,87 @@ class JobQueueNotifier:
 
             logger.info(f"Найдено {len(subscriptions)} подписок на {current_time}")
 
-            for telegram_id, city, _ in subscriptions:
-                await self.send_weather_notification(context.bot, telegram_id, city)
-                await asyncio.sleep(0.5)
+            # Подписки в одной ячейке сетки (или в одном городе) делят один запрос к API
+            groups = {}
+            for telegram_id, city, latitude, longitude in subscriptions:
+                if latitude is not None and longitude is not None:
+                    key = ("geo", geo.encode(latitude, longitude))
+                else:
+                    key = ("city", city.strip().lower())
+                if key not in groups:
+                    groups[key] = (city, latitude, longitude, [])
+                groups[key][3].append(telegram_id)
+
+            logger.info(f"Подписки сгруппированы в {len(groups)} локаций")
+
+            semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+            async def fetch(city, latitude, longitude):
+                async with semaphore:
+                    return await asyncio.to_thread(self.fetch_weather, city, latitude, longitude)
+
+            results = await asyncio.gather(*(
+                fetch(city, latitude, longitude) for city, latitude, longitude, _ in groups.values()
+            ))
+
+            for (city, _, _, chat_ids), weather_data in zip(groups.values(), results):
+                if not weather_data:
+                    logger.warning(f"Не удалось получить погоду для {city}")
+                    continue
+
+                message = messages.render_weather("notification", weather_data)
+                for telegram_id in chat_ids:
+                    await self.send_weather_notification(context.bot, telegram_id, city, message)
+                    await asyncio.sleep(0.5)
 
         except Exception as e:
             logger.error(f"Ошибка проверки уведомлений: {e}")
 
+    async def fetch_forecasts(self, cities):
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def fetch(city):
+            async with semaphore:
+                forecast = await asyncio.to_thread(self.weather_api.get_forecast_series, city, FORECAST_HOURS)
+                return city, forecast
+
+        return dict(await asyncio.gather(*(fetch(city) for city in cities)))
+
+    async def check_and_send_alerts(self, context):
+        try:
+            rules = get_all_alert_rules()
+            if not rules:
+                logger.debug("Нет правил оповещений")
+                return
+
+            compiled = compile_rules(rules)
+
+            started = time.perf_counter()
+            forecasts = await self.fetch_forecasts(compiled.cities)
+            fetched = time.perf_counter()
+
+            timestamps, values = stack_forecasts(compiled.cities, forecasts)
+            alerts = self.alert_engine.collect_alerts(compiled, timestamps, values, time.time())
+            logger.info(
+                f"Прогнозы для {len(compiled.cities)} городов получены за {fetched - started:.1f} с, "
+                f"{len(compiled)} правил проверено за {(time.perf_counter() - fetched) * 1000:.1f} мс, "
+                f"оповещений: {len(alerts)}"
+            )
+
+            for alert in alerts:
+                try:
+                    await context.bot.send_message(
+                        chat_id=alert["telegram_id"],
+                        text=messages.render_alert(alert),
+                        parse_mode=messages.PARSE_MODE
+                    )
+                except Exception as e:
+                    logger.error(f"Ошибка отправки оповещения: {e}")
+                await asyncio.sleep(0.05)
+
+        except Exception as e:
+            logger.error(f"Ошибка проверки оповещений: {e}")
+
     def start(self, application):
         if not application.job_queue:
             logger.error("JobQueue не доступен")
@@ -84,6 +165,12 @@ class JobQueueNotifier:
             first=10
         )
 
+        application.job_queue.run_repeating(
+            callback=self.check_and_send_alerts,
+            interval=ALERT_CHECK_INTERVAL,
+            first=30
+        )
+
         logger.info("JobQueueNotifier запущен")
         return True
 
@@ -45,6 +45,25 @@ def init_database():
                 user_id INTEGER REFERENCES users(id),
                 city VARCHAR(100) NOT NULL,
                 notification_time VARCHAR(5) NOT NULL,
+                latitude REAL,
+                longitude REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        cur.execute("""
+            ALTER TABLE subscriptions
+                ADD COLUMN IF NOT EXISTS latitude REAL,
+                ADD COLUMN IF NOT EXISTS longitude REAL
+        """)
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS alert_rules (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER REFERENCES users(id),
+                city VARCHAR(100) NOT NULL,
+                kind VARCHAR(20) NOT NULL,
+                threshold REAL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -87,7 +106,8 @@ def add_user(telegram_id: int, username: str = None, first_name: str = None) ->
         return False
 
 
-def add_subscription(telegram_id: int, city: str, notification_time: str) -> Optional[int]:
+def add_subscription(telegram_id: int, city: str, notification_time: str,
+                     latitude: Optional[float] = None, longitude: Optional[float] = None) -> Optional[int]:
     conn = get_db_connection()
     if not conn:
         return None
@@ -105,10 +125,10 @@ def add_subscription(telegram_id: int, city: str, notification_time: str) -> Opt
         user_id = user_result[0]
 
         cur.execute("""
-            INSERT INTO subscriptions (user_id, city, notification_time)
-            VALUES (%s, %s, %s)
+            INSERT INTO subscriptions (user_id, city, notification_time, latitude, longitude)
+            VALUES (%s, %s, %s, %s, %s)
             RETURNING id
-        """, (user_id, city, notification_time))
+        """, (user_id, city, notification_time, latitude, longitude))
 
         subscription_id = cur.fetchone()[0]
 
@@ -166,4 +186,114 @@ def delete_subscription(subscription_id: int) -> bool:
 
     except Exception as e:
         logger.error(f"Ошибка удаления подписки: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def add_alert_rule(telegram_id: int, city: str, kind: str, threshold: Optional[float] = None) -> Optional[int]:
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        add_user(telegram_id)
+
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM users WHERE telegram_id = %s", (telegram_id,))
+        user_result = cur.fetchone()
+
+        if not user_result:
+            return None
+
+        user_id = user_result[0]
+
+        cur.execute("""
+            INSERT INTO alert_rules (user_id, city, kind, threshold)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id
+        """, (user_id, city, kind, threshold))
+
+        rule_id = cur.fetchone()[0]
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        return rule_id
+
+    except Exception as e:
+        logger.error(f"Ошибка добавления оповещения: {e}")
+        return None
+
+
+def get_user_alert_rules(telegram_id: int) -> List[Tuple]:
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT r.id, r.city, r.kind, r.threshold
+            FROM alert_rules r
+            JOIN users u ON r.user_id = u.id
+            WHERE u.telegram_id = %s
+            ORDER BY r.created_at
+        """, (telegram_id,))
+
+        rules = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        return rules
+
+    except Exception as e:
+        logger.error(f"Ошибка получения оповещений: {e}")
+        return []
+
+
+def get_all_alert_rules() -> List[Tuple]:
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT u.telegram_id, r.city, r.kind, r.threshold
+            FROM alert_rules r
+            JOIN users u ON r.user_id = u.id
+        """)
+
+        rules = cur.fetchall()
+        cur.close()
+        conn.close()
+
+        return rules
+
+    except Exception as e:
+        logger.error(f"Ошибка получения оповещений: {e}")
+        return []
+
+
+def delete_alert_rule(telegram_id: int, rule_id: int) -> bool:
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM alert_rules
+            WHERE id = %s
+              AND user_id = (SELECT id FROM users WHERE telegram_id = %s)
+        """, (rule_id, telegram_id))
+
+        conn.commit()
+        cur.close()
+        conn.close()
+
+        return cur.rowcount > 0
+
+    except Exception as e:
+        logger.error(f"Ошибка удаления оповещения: {e}")
+        return False
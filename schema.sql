@@ -11,5 +11,16 @@ CREATE TABLE IF NOT EXISTS subscriptions (
     user_id INTEGER REFERENCES users(id),
     city VARCHAR(100) NOT NULL,
     notification_time VARCHAR(5) NOT NULL,
+    latitude REAL,
+    longitude REAL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id),
+    city VARCHAR(100) NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    threshold REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
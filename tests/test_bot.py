@@ -0,0 +1,330 @@
+import math
+import re
+
+import numpy as np
+import requests
+
+from app.api import geo
+from app.bot import admin, alerts, messages
+
+NOW = 1_000_000.0
+STEP = alerts.STEP_SECONDS
+
+
+def make_forecast(steps=8, start=NOW - 3600, **series):
+    forecast = {
+        "timestamps": [start + STEP * i for i in range(steps)],
+        "temperature": [10.0] * steps,
+        "wind_speed": [0.0] * steps,
+        "precipitation": [0.0] * steps,
+    }
+    forecast.update(series)
+    return forecast
+
+
+def run(rules, forecasts, now=NOW, engine=None):
+    compiled = alerts.compile_rules(rules)
+    timestamps, values = alerts.stack_forecasts(compiled.cities, forecasts)
+    return (engine or alerts.AlertEngine()).collect_alerts(compiled, timestamps, values, now)
+
+
+def test_compile_rules_shares_identical_predicates():
+    compiled = alerts.compile_rules([
+        (1, "Москва", "wind", 10),
+        (2, " москва ", "wind", 10),
+        (3, "Москва", "wind", 12),
+        (4, "Москва", "unknown", None),
+    ])
+
+    assert compiled.cities == ["Москва"]
+    assert len(compiled) == 3
+    assert len(compiled.predicates) == 2
+    assert compiled.inverse[0] == compiled.inverse[1] != compiled.inverse[2]
+
+
+def test_compile_rules_skips_invalid_params():
+    compiled = alerts.compile_rules([
+        (1, "Москва", "rain", 100),
+        (2, "Москва", "wind", float("nan")),
+        (3, "Москва", "frost", -3),
+    ])
+
+    assert compiled.owners == [(3, "frost")]
+
+
+def test_is_valid_param():
+    assert alerts.is_valid_param("rain", 6)
+    assert not alerts.is_valid_param("rain", alerts.MAX_HORIZON_HOURS + 1)
+    assert not alerts.is_valid_param("rain", -1)
+    assert not alerts.is_valid_param("wind", math.inf)
+    assert not alerts.is_valid_param("frost", math.nan)
+
+
+def test_event_bounds_extend_past_horizon():
+    forecast = make_forecast(precipitation=[0, 0.5, 0.5, 0.5, 0, 0.5, 0, 0])
+    result = run([(1, "Москва", "rain", 3)], {"Москва": forecast})
+
+    assert len(result) == 1
+    assert result[0]["start"] == forecast["timestamps"][1]
+    assert result[0]["end"] == forecast["timestamps"][3] + STEP
+
+
+def test_event_until_end_of_forecast():
+    forecast = make_forecast(wind_speed=[0, 0, 0, 0, 0, 0, 20, 20])
+    result = run([(1, "Москва", "wind", None)], {"Москва": forecast})
+
+    assert result[0]["start"] == forecast["timestamps"][6]
+    assert result[0]["end"] == forecast["timestamps"][7] + STEP
+
+
+def test_horizon_window_limits_firing():
+    forecast = make_forecast(precipitation=[0, 0, 0, 0.5, 0, 0, 0, 0])
+    rules = [(1, "Москва", "rain", 3), (2, "Москва", "rain", 12)]
+
+    result = run(rules, {"Москва": forecast})
+
+    assert [alert["telegram_id"] for alert in result] == [2]
+
+
+def test_past_steps_are_ignored():
+    forecast = make_forecast(start=NOW - 2 * STEP, temperature=[-5, 5, 5, 5, 5, 5, 5, 5])
+    assert run([(1, "Москва", "frost", None)], {"Москва": forecast}) == []
+
+
+def test_frost_compares_below_threshold():
+    forecast = make_forecast(temperature=[1, -1, 1, 1, 1, 1, 1, 1])
+    assert len(run([(1, "Москва", "frost", 0)], {"Москва": forecast})) == 1
+    assert run([(1, "Москва", "frost", -2)], {"Москва": forecast}) == []
+
+
+def test_missing_city_and_short_forecast_are_padded():
+    short = make_forecast(steps=3, wind_speed=[0, 0, 20])
+    rules = [(1, "Москва", "wind", None), (2, "Париж", "wind", None)]
+
+    compiled = alerts.compile_rules(rules)
+    timestamps, values = alerts.stack_forecasts(compiled.cities, {"Москва": short, "Париж": None})
+    result = alerts.AlertEngine().collect_alerts(compiled, timestamps, values, NOW)
+
+    assert np.isnan(timestamps[1]).all()
+    assert [alert["telegram_id"] for alert in result] == [1]
+    assert result[0]["end"] == short["timestamps"][2] + STEP
+
+
+def test_one_alert_per_user_and_event():
+    forecast = make_forecast(wind_speed=[0, 20, 20, 20, 0, 0, 0, 0])
+    rules = [(1, "Москва", "wind", 10), (1, "Москва", "wind", 12), (2, "Москва", "wind", 10)]
+
+    result = run(rules, {"Москва": forecast})
+
+    assert sorted(alert["telegram_id"] for alert in result) == [1, 2]
+
+
+def test_dedup_across_runs():
+    engine = alerts.AlertEngine()
+    rules = [(1, "Москва", "wind", None)]
+    first = make_forecast(wind_speed=[0, 20, 20, 0, 0, 0, 20, 0])
+
+    assert len(run(rules, {"Москва": first}, engine=engine)) == 1
+    # Тот же порыв на следующей проверке не дублируется
+    assert run(rules, {"Москва": first}, now=NOW + 3600, engine=engine) == []
+    # Новое событие после окончания предыдущего приходит снова
+    later = NOW + 4 * STEP
+    result = run(rules, {"Москва": first}, now=later, engine=engine)
+    assert len(result) == 1
+    assert result[0]["start"] == first["timestamps"][6]
+
+
+def test_geohash_encode_known_value():
+    assert geo.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_geohash_decode_is_cell_center():
+    lat, lon = geo.decode("u4pruydqqvj")
+    assert abs(lat - 57.64911) < 1e-4
+    assert abs(lon - 10.40744) < 1e-4
+    assert geo.encode(lat, lon, 11) == "u4pruydqqvj"
+
+
+def test_snap_shares_cell_for_nearby_points():
+    cell, lat, lon = geo.snap(55.7558, 37.6173, 5)
+    assert geo.snap(55.757, 37.619, 5) == (cell, lat, lon)
+    assert geo.encode(lat, lon, 5) == cell
+    assert geo.snap(59.9386, 30.3141, 5)[0] != cell
+
+
+def make_weather(**fields):
+    weather_data = {
+        "city": "Москва",
+        "country": "RU",
+        "temperature": 5.0,
+        "feels_like": 3.0,
+        "humidity": 70,
+        "wind_speed": 2.5,
+        "weather": "Ясно",
+        "timestamp": 1700000000,
+    }
+    weather_data.update(fields)
+    return weather_data
+
+
+def test_escape_markdown_v2():
+    assert messages.escape("San_Jose*[x]") == "San\\_Jose\\*\\[x\\]"
+    assert messages.escape("-3.5 (ясно)!") == "\\-3\\.5 \\(ясно\\)\\!"
+    assert messages.escape("a\\b") == "a\\\\b"
+
+
+def test_render_weather_escapes_values():
+    text = messages.render_weather("current", make_weather(city="Nova_*York", temperature=-3.25))
+
+    assert "*Nova\\_\\*York, RU*" in text
+    assert "*\\-3\\.2°C*" in text
+
+
+def test_render_weather_reuses_identical_snapshot():
+    first = messages.render_weather("notification", make_weather(humidity=71))
+    assert messages.render_weather("notification", make_weather(humidity=71)) is first
+
+
+def test_render_weather_cache_key_covers_rendered_values():
+    warm = messages.render_weather("current", make_weather(wind_speed=1.1))
+    cold = messages.render_weather("current", make_weather(wind_speed=1.1, temperature=-7.3, weather="Снег"))
+
+    assert warm != cold
+    assert "\\-7\\.3°C" in cold and "Снег" in cold
+
+
+def test_render_list_item_escapes_city():
+    text = messages.render("subscription_item", index=1, city="a_b", time="08:30", id=5)
+    assert text.startswith("1\\. *a\\_b* в 08:30")
+
+
+def test_detect_format():
+    assert admin.detect_format("subs.ndjson", None) == "ndjson"
+    assert admin.detect_format("subs.jsonl", None) == "ndjson"
+    assert admin.detect_format("subs.csv", None) == "csv"
+    assert admin.detect_format("-", None) == "csv"
+    assert admin.detect_format("subs.csv", "ndjson") == "ndjson"
+
+
+def test_read_rows_ndjson_keeps_bad_lines(tmp_path):
+    path = tmp_path / "subs.ndjson"
+    path.write_text('{"telegram_id": 1}\n\nnot json\n{"telegram_id": 2}\n', encoding="utf-8")
+
+    assert list(admin.read_rows(str(path), "ndjson")) == [{"telegram_id": 1}, {}, {"telegram_id": 2}]
+
+
+def test_read_rows_csv(tmp_path):
+    path = tmp_path / "subs.csv"
+    path.write_text("telegram_id,city,notification_time\n1,Москва,08:30\n", encoding="utf-8")
+
+    assert list(admin.read_rows(str(path), "csv")) == [
+        {"telegram_id": "1", "city": "Москва", "notification_time": "08:30"}
+    ]
+
+
+def make_row(**fields):
+    row = {"telegram_id": "42", "city": " Москва ", "notification_time": "8:30"}
+    row.update(fields)
+    return row
+
+
+def test_validate_row_normalises_values():
+    assert admin.validate_row(make_row(username="", first_name="Anna")) == [
+        42, None, "Anna", "Москва", "08:30", None, None
+    ]
+    assert admin.validate_row(make_row(notification_time="8:5"))[4] == "08:05"
+
+
+def test_validate_row_coordinates():
+    assert admin.validate_row(make_row(latitude="55.75", longitude="37.61"))[5:] == [55.75, 37.61]
+    # Неполные координаты считаются отсутствующими
+    assert admin.validate_row(make_row(latitude="55.75", longitude=""))[5:] == [None, None]
+    assert admin.validate_row(make_row(latitude="91", longitude="0")) is None
+    assert admin.validate_row(make_row(latitude="0", longitude="-181")) is None
+
+
+def test_validate_row_rejects_bad_rows():
+    assert admin.validate_row(make_row(city="  ")) is None
+    assert admin.validate_row(make_row(city="x" * 101)) is None
+    assert admin.validate_row(make_row(notification_time="25:00")) is None
+    assert admin.validate_row(make_row(telegram_id="abc")) is None
+    assert admin.validate_row({"city": "Москва", "notification_time": "08:30"}) is None
+    assert admin.validate_row([]) is None
+
+
+def test_validate_row_telegram_id():
+    assert admin.validate_row(make_row(telegram_id=7.0))[0] == 7
+    assert admin.validate_row(make_row(telegram_id=1.9)) is None
+    assert admin.validate_row(make_row(telegram_id=True)) is None
+    assert admin.validate_row(make_row(telegram_id=str(2 ** 63))) is None
+    assert admin.validate_row(make_row(telegram_id=str(2 ** 63 - 1)))[0] == 2 ** 63 - 1
+
+
+def test_validate_row_truncates_names():
+    row = admin.validate_row(make_row(username="u" * 150, first_name=12345))
+    assert row[1] == "u" * admin.MAX_NAME_LENGTH
+    assert row[2] == "12345"
+
+
+def test_copy_batch_encodes_nulls_and_quotes():
+    class Cursor:
+        def copy_expert(self, sql, buffer):
+            self.sql = sql
+            self.data = buffer.read()
+
+    cur = Cursor()
+    admin.copy_batch(cur, [
+        [1, None, 'Ann "A", B', "Москва", "08:30", None, None],
+        [2, "bob", None, "Париж", "19:00", 48.85, 2.35],
+    ])
+
+    assert cur.sql.startswith("COPY import_subscriptions (telegram_id, username, first_name, city,")
+    assert cur.data.splitlines() == [
+        '1,,"Ann ""A"", B",Москва,08:30,,',
+        "2,bob,,Париж,19:00,48.85,2.35",
+    ]
+
+
+def test_resolve_city_retries_only_transient_errors(monkeypatch):
+    monkeypatch.setattr(admin, "RESOLVE_BACKOFF", 0)
+
+    class Api:
+        def __init__(self, status):
+            self.status = status
+            self.calls = 0
+
+        def find_city(self, name):
+            self.calls += 1
+            response = requests.Response()
+            response.status_code = self.status
+            raise requests.exceptions.HTTPError(response=response)
+
+    unauthorized, limited = Api(401), Api(429)
+    for api in (unauthorized, limited):
+        try:
+            admin.resolve_city(api, "Москва")
+        except RuntimeError:
+            pass
+
+    assert unauthorized.calls == 1
+    assert limited.calls == admin.RESOLVE_RETRIES
+
+
+def test_templates_escape_reserved_characters():
+    # * и ` используются в шаблонах как разметка, остальные символы должны быть экранированы
+    reserved = set("_[]()~>#+-=|{}.!")
+
+    for key, template in messages.TEMPLATES.items():
+        text = re.sub(r"\{\w+\}", "", template.__self__)
+        i = 0
+        while i < len(text):
+            if text[i] == "\\":
+                i += 2
+                continue
+            assert text[i] not in reserved, (key, text)
+            i += 1
+
+
+def test_list_footers_render():
+    assert messages.render("subscriptions_footer").endswith("/unsubscribe <ID\\>")
+    assert messages.render("alerts_footer").endswith("/unalert <ID\\>")